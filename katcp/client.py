@@ -124,6 +124,14 @@ class DeviceClient(with_metaclass(DeviceMetaclass, object)):
     If more than MAX_MSG_SIZE bytes are read from the socket without
     encountering a message terminator (i.e. newline), the connection is closed.
 
+    """
+    MAX_READ_BUFFER_SIZE = 4*MAX_MSG_SIZE
+    """Maximum number of received bytes to be buffered.
+
+    This is larger than MAX_MSG_SIZE so that a burst of pipelined messages
+    can be buffered in one go. If more than MAX_READ_BUFFER_SIZE bytes are
+    waiting to be processed, the connection is closed.
+
     """
     MAX_WRITE_BUFFER_SIZE = 2*MAX_MSG_SIZE
     """Maximum outstanding bytes to be buffered by the server process.
@@ -425,7 +433,7 @@ class DeviceClient(with_metaclass(DeviceMetaclass, object)):
 
         """
         assert get_thread_ident() == self.ioloop_thread_id
-        data = bytes(msg) + b"\n"
+        data = msg.to_line()
 
         # Log all sent messages here so no one else has to.
         if self._logger.isEnabledFor(logging.DEBUG):
@@ -455,7 +463,7 @@ class DeviceClient(with_metaclass(DeviceMetaclass, object)):
         try:
             host, port = self._bindaddr
             stream = self._stream = yield self._tcp_client.connect(
-                host, port, max_buffer_size=self.MAX_MSG_SIZE)
+                host, port, max_buffer_size=self.MAX_READ_BUFFER_SIZE)
             stream.set_close_callback(partial(self._stream_closed_callback,
                                               stream))
             # our message packets are small, don't delay sending them.
@@ -726,7 +734,9 @@ class DeviceClient(with_metaclass(DeviceMetaclass, object)):
         latency_timer = LatencyTimer(self.MAX_LOOP_LATENCY)
         while self._running.isSet():
             try:
-                line_fut = self._stream.read_until_regex(b'\n|\r')
+                # Streams are closed if too-large messages are received
+                line_fut = self._stream.read_until_regex(
+                    self._parser.LINE_TERMINATOR_RE, max_bytes=self.MAX_MSG_SIZE)
                 latency_timer.check_future(line_fut)
                 if latency_timer.time_to_yield():
                     yield gen.moment
@@ -49,6 +49,25 @@ INTERFACE_CHANGED_KATCP_MAJOR = 5
 
 logger = logging.getLogger(__name__)
 
+# Message names are drawn from a small set, so cache their conversions
+# between native strings and the bytes sent on the wire
+_NAME_CACHE_MAX_SIZE = 256
+_native_names = {}
+_encoded_names = {}
+
+
+def _convert_name(cache, name, convert):
+    """Return convert(name) after adding it to cache."""
+    converted = convert(name)
+    if len(cache) >= _NAME_CACHE_MAX_SIZE:
+        cache.clear()
+    cache[name] = converted
+    return converted
+
+
+def _encode_name(name):
+    return name.encode('ascii')
+
 
 class Reading(namedtuple('Reading', 'timestamp status value')):
     """Sensor reading as a (timestamp, status, value) tuple.
@@ -299,14 +318,15 @@ class Message(object):
 
     def format_argument(self, arg):
         """Format a Message argument to a byte string"""
-        if isinstance(arg, bool):
+        # Check for bytes first since that is what the parser produces
+        if is_bytes(arg):
+            return arg
+        elif isinstance(arg, bool):
             return b'1' if arg else b'0'
         elif isinstance(arg, int):
             return b'%d' % arg
         elif isinstance(arg, float):
             return repr(arg).encode('ascii')
-        elif is_bytes(arg):
-            return arg
         elif is_text(arg):
             return encode_utf8_with_error_log(arg)
         # Note: checks for Integral and Real allow for numpy types,
@@ -341,11 +361,28 @@ class Message(object):
            The raw bytes of the serialised message, excluding terminating newline.
 
         """
+        return self._serialise(b"")
+
+    def to_line(self):
+        """Return Message serialized for transmission as a complete line.
+
+        Equivalent to ``bytes(msg) + b"\\n"``, but without the intermediate
+        copy of the serialised message.
+
+        Returns
+        -------
+        line : bytes
+           The raw bytes of the serialised message, including terminating
+           newline.
+
+        """
+        return self._serialise(b"\n")
+
+    def _serialise(self, terminator):
         if self.arguments:
-            escaped_args = [self.ESCAPE_RE.sub(self._escape_match, x)
-                            for x in self.arguments]
-            escaped_args = [x or b"\\@" for x in escaped_args]
-            arg_str = b" " + b" ".join(escaped_args)
+            sub, escape_match = self.ESCAPE_RE.sub, self._escape_match
+            arg_str = b" " + b" ".join([sub(escape_match, x) or b"\\@"
+                                        for x in self.arguments])
         else:
             arg_str = b""
 
@@ -354,8 +391,12 @@ class Message(object):
         else:
             mid_str = b""
 
-        return b"%s%s%s%s" % (self.TYPE_SYMBOLS[self.mtype], self.name.encode('ascii'),
-                              mid_str, arg_str)
+        try:
+            name = _encoded_names[self.name]
+        except KeyError:
+            name = _convert_name(_encoded_names, self.name, _encode_name)
+        return b"%s%s%s%s%s" % (self.TYPE_SYMBOLS[self.mtype], name, mid_str,
+                                arg_str, terminator)
 
     def __str__(self):
         """Return Message serialized for transmission as native string.
@@ -538,12 +579,19 @@ class MessageParser(object):
     ## @brief Regular expression matching all special characters.
     SPECIAL_RE = re.compile(br"[\0\n\r\x1b\t ]")
 
+    ## @brief Regular expression matching special characters that may not
+    ## appear between arguments (i.e. excluding whitespace).
+    ARG_SPECIAL_RE = re.compile(br"[\0\n\r\x1b]")
+
     ## @brief Regular expression matching all escapes.
     UNESCAPE_RE = re.compile(br"\\(.?)")
 
     ## @brief Regular expression matching KATCP whitespace (just space and tab)
     WHITESPACE_RE = re.compile(br"[ \t]+")
 
+    ## @brief Regular expression matching the end of a line (message)
+    LINE_TERMINATOR_RE = re.compile(br"\n|\r")
+
     ## @brief Regular expression matching name and ID
     NAME_RE = re.compile(
         br"^(?P<name>[a-zA-Z][a-zA-Z0-9\-]*)(\[(?P<id>[0-9]+)\])?$")
@@ -602,7 +650,14 @@ class MessageParser(object):
             del parts[-1]
 
         name = parts[0][1:]
-        arguments = [self._parse_arg(x) for x in parts[1:]]
+        # Most messages contain no special characters or escapes, so check
+        # the whole argument string at once before falling back to parsing
+        # each argument individually
+        arg_str = line[len(parts[0]):]
+        if self.ARG_SPECIAL_RE.search(arg_str) or b"\\" in arg_str:
+            arguments = [self._parse_arg(x) for x in parts[1:]]
+        else:
+            arguments = parts[1:]
 
         # split out message id
         match = self.NAME_RE.match(name)
@@ -613,7 +668,10 @@ class MessageParser(object):
             raise KatcpSyntaxError("Bad message name (and possibly id) %r." %
                                    (ensure_native_str(name),))
 
-        name = ensure_native_str(name)
+        try:
+            name = _native_names[name]
+        except KeyError:
+            name = _convert_name(_native_names, name, ensure_native_str)
 
         return Message(mtype, name, arguments, mid)
 
@@ -1068,6 +1126,9 @@ class Sensor(object):
 
         self._current_reading = Reading(time.time(), initial_status,
                                         default_value)
+        # (reading, major, formatted) for the last formatted reading, stored
+        # as a single tuple for the same reason as _current_reading above.
+        self._formatted_reading = (None, None, None)
         self._formatter = self._kattype.pack
         self._parser = self._kattype.unpack
         # Also Expose `type` attribute to be compatible with resource.KATCPSensor
@@ -1462,12 +1523,20 @@ class Sensor(object):
         -----
         Should only be used for a reading obtained from the same sensor.
 
-        """
+        The most recently formatted reading is cached, so formatting the same
+        reading object again (e.g. polling a sensor that has not been updated,
+        or sending one update to several sampling clients) reuses the result.
 
+        """
+        cached_reading, cached_major, formatted = self._formatted_reading
+        if reading is cached_reading and major == cached_major:
+            return formatted
         timestamp, status, value = reading
-        return (self.TIMESTAMP_TYPE.encode(timestamp, major),
-                self.STATUSES_RAW[status],
-                self._formatter(value, True, major))
+        formatted = (self.TIMESTAMP_TYPE.encode(timestamp, major),
+                     self.STATUSES_RAW[status],
+                     self._formatter(value, True, major))
+        self._formatted_reading = (reading, major, formatted)
+        return formatted
 
     def read(self):
         """Read the sensor and return a (timestamp, status, value) tuple.
@@ -1599,6 +1668,10 @@ class DefaultAttrDict(defaultdict):
         self.__dict__ = self
 
     def __getattr__(self, name):
+        # Fail fast on special attribute probes (e.g. hasattr() checks done
+        # by copy, pickle or mock) instead of creating default entries
+        if name.startswith('__'):
+            raise AttributeError(name)
         return self[name]
 
 class AsyncEvent(object):
@@ -2016,17 +2089,39 @@ def until_some(*args, **kwargs):
     done_at_least = kwargs.pop('done_at_least', None)
     timeout = kwargs.pop('timeout', None)
     # At this point args and kwargs are either empty or contain futures only
+    if args and kwargs:
+        raise ValueError("You must provide args or kwargs, not both")
+    futures = list(enumerate(args)) if args else list(kwargs.items())
     if done_at_least is None:
-        done_at_least = len(args) + len(kwargs)
-    wait_iterator = tornado.gen.WaitIterator(*args, **kwargs)
-    maybe_timeout = future_timeout_manager(timeout)
+        done_at_least = len(futures)
+    # Wait for at least one future (if there are any) but no more than all
+    done_at_least = min(max(done_at_least, 1), len(futures))
+    if not done_at_least:
+        raise tornado.gen.Return([])
+    # Collect results via done callbacks into a single future, rather than
+    # resuming this coroutine once per underlying future
     results = []
-    while not wait_iterator.done():
-        result = yield maybe_timeout(wait_iterator.next())
-        results.append((wait_iterator.current_index, result))
-        if len(results) >= done_at_least:
-            break
-    raise tornado.gen.Return(results)
+    some_future = tornado_Future()
+
+    def handle_done(key, done_future):
+        if some_future.done():
+            return
+        try:
+            results.append((key, done_future.result()))
+        except Exception:
+            # Like chain_future(), also handle concurrent.futures.Future
+            if hasattr(done_future, 'exc_info'):
+                some_future.set_exc_info(done_future.exc_info())
+            else:
+                some_future.set_exception(done_future.exception())
+        else:
+            if len(results) >= done_at_least:
+                some_future.set_result(results)
+
+    for key, fut in futures:
+        fut.add_done_callback(partial(handle_done, key))
+    maybe_timeout = future_timeout_manager(timeout)
+    raise tornado.gen.Return((yield maybe_timeout(some_future)))
 
 
 def encode_utf8_with_error_log(arg):
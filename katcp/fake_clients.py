@@ -323,6 +323,10 @@ class FakeKATCPServer(object):
         raise FakeKATCPServerError(
             'Cannot send messages via fake request/connection object')
 
+    def send_messages(self, conn_id, msgs):
+        raise FakeKATCPServerError(
+            'Cannot send messages via fake request/connection object')
+
     def mass_send_message(self, msg):
         raise FakeKATCPServerError(
             'Cannot send messages via fake request/connection object')
@@ -342,6 +346,10 @@ class FakeClientRequestConnection(server.ClientRequestConnection):
         inf_msg = Message.reply_inform(self.msg, *args)
         self.informs_sent.append(inf_msg)
 
+    def informs(self, arg_lists):
+        self.informs_sent.extend(Message.reply_inform(self.msg, *args)
+                                 for args in arg_lists)
+
 
 class FakeAsyncClient(client.AsyncClient):
     """Fake version of :class:`katcp.client.AsyncClient`
@@ -202,6 +202,14 @@ class InspectingClientAsync(object):
 
     """
 
+    pipeline_inspection = True
+    """Send the ?help and ?sensor-list inspection requests concurrently.
+
+    Pipelining the requests saves a round trip per (re)sync. Set to False
+    for devices that cannot handle more than one outstanding request.
+
+    """
+
     # TODO (NM 2016-10-21) sync_timeout should be 5 seconds, but until we deal
     # with the thundering herd at startup when connecting to a large number of
     # clients concurrently in a single process, see Jira CB-1609
@@ -599,16 +607,27 @@ class InspectingClientAsync(object):
         timeout_manager = future_timeout_manager(self.sync_timeout)
         sensor_index_before = copy.copy(self._sensors_index)
         request_index_before = copy.copy(self._requests_index)
+        # inspect_sensors() evicts removed sensors from the object cache, and
+        # may succeed while a pipelined inspect_requests() fails
+        sensor_object_cache_before = copy.copy(self._sensor_object_cache)
         try:
-            request_changes = yield self.inspect_requests(
-                timeout=timeout_manager.remaining())
-            sensor_changes = yield self.inspect_sensors(
-                timeout=timeout_manager.remaining())
+            if self.pipeline_inspection:
+                # Both inspections are complete once multi() resolves, even
+                # if one of them failed, so the indexes can be restored below
+                request_changes, sensor_changes = yield tornado.gen.multi([
+                    self.inspect_requests(timeout=timeout_manager.remaining()),
+                    self.inspect_sensors(timeout=timeout_manager.remaining())])
+            else:
+                request_changes = yield self.inspect_requests(
+                    timeout=timeout_manager.remaining())
+                sensor_changes = yield self.inspect_sensors(
+                    timeout=timeout_manager.remaining())
         except Exception:
             # Ensure atomicity of sensor and request updates ; if the one
             # fails, the other should act as if it has failed too.
             self._sensors_index = sensor_index_before
             self._requests_index = request_index_before
+            self._sensor_object_cache = sensor_object_cache_before
             raise
 
         model_changes = AttrDict()
@@ -20,6 +20,7 @@ from future.utils import PY2
 
 from tornado.concurrent import Future as tornado_Future
 from tornado.gen import Return
+from tornado.locks import Semaphore
 
 from katcp import Message, inspecting_client, resource
 from katcp.core import (AsyncCallbackEvent, AsyncEvent, AsyncState, AttrDict,
@@ -996,6 +997,17 @@ class GroupRequest(object):
     its result is None.
 
     """
+    MAX_CONCURRENT_REQUESTS = None
+    """Maximum number of requests in flight at once, or None for no limit.
+
+    The limit is shared by all concurrent calls of the same GroupRequest
+    instance. Limiting the concurrency stops a large group from piling
+    requests onto shared infrastructure all at once, and prevents a few slow
+    clients from delaying the dispatch of requests to the rest. Can be set
+    per class or per instance.
+
+    """
+
     def __init__(self, group, name, description):
         """Initialise the GroupRequest
 
@@ -1013,6 +1025,8 @@ class GroupRequest(object):
         self.group = group
         self.name = name
         self.description = description
+        self._semaphore = None
+        self._semaphore_limit = None
         self.__doc__ = '\n'.join(('KATCP Documentation',
                                   '===================',
                                   description,
@@ -1025,9 +1039,13 @@ class GroupRequest(object):
         result_futures = {}
         none_future = Future()
         none_future.set_result(None)
+        semaphore = self._get_semaphore()
         for client in self.group.clients:
             request_method = getattr(client.req, self.name, None)
-            if request_method:
+            if request_method and semaphore:
+                result_futures[client.name] = self._limited_request(
+                    semaphore, request_method, args, kwargs)
+            elif request_method:
                 result_futures[client.name] = request_method(*args, **kwargs)
             else:
                 result_futures[client.name] = none_future
@@ -1035,6 +1053,23 @@ class GroupRequest(object):
         results = yield result_futures
         raise Return(GroupResults(results))
 
+    def _get_semaphore(self):
+        """Return the semaphore shared by all calls, or None for no limit."""
+        limit = self.MAX_CONCURRENT_REQUESTS
+        if not limit:
+            return None
+        # Created lazily, and again if the limit changes
+        if self._semaphore is None or self._semaphore_limit != limit:
+            self._semaphore = Semaphore(limit)
+            self._semaphore_limit = limit
+        return self._semaphore
+
+    @tornado.gen.coroutine
+    def _limited_request(self, semaphore, request_method, args, kwargs):
+        with (yield semaphore.acquire()):
+            reply = yield request_method(*args, **kwargs)
+        raise Return(reply)
+
 
 class GroupResults(dict):
     """The result of a group request.
@@ -1598,7 +1633,20 @@ class ThreadSafeKATCPSensorWrapper(ThreadSafeMethodAttrWrapper):
 class ThreadSafeKATCPClientResourceRequestWrapper(ThreadSafeMethodAttrWrapper):
     @property
     def __call__(self):
-        return self._ioloop_wrapper.decorate_callable(self.__subject__.__call__)
+        # Decorating the request is relatively expensive, so only do it once for
+        # each request / ioloop wrapper pair rather than on every call. The
+        # decorated callables are stored on the request object itself. Each
+        # one references both the request and its ioloop wrapper, so this
+        # forms a reference cycle that keeps every ioloop wrapper used here
+        # alive until the request itself is garbage collected.
+        request = self.__subject__
+        decorated_calls = request.__dict__.setdefault('_thread_safe_calls', {})
+        try:
+            return decorated_calls[self._ioloop_wrapper]
+        except KeyError:
+            decorated = self._ioloop_wrapper.decorate_callable(request.__call__)
+            decorated_calls[self._ioloop_wrapper] = decorated
+            return decorated
 
 
 class MappingProxy(collections.Mapping):
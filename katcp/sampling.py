@@ -31,16 +31,24 @@ AGE_OF_UNIVERSE = 4.32329886e17  # approximate age of the universe
 
 # pylint: disable-msg=W0142
 
-def format_inform_v4(sensor, *reading):
-    timestamp, status, value = sensor.format_reading(reading, 4)
+def format_reading_inform(sensor, reading, major):
+    """Return a #sensor-status inform for a reading of the given sensor.
+
+    The reading should be passed on as received from the sensor, so that
+    all clients sampling the same update share its formatted reading.
+
+    """
+    timestamp, status, value = sensor.format_reading(reading, major)
     return Message.inform(
-        "sensor-status", timestamp, "1", sensor.name, status, value)
+        "sensor-status", timestamp, b"1", sensor.name, status, value)
+
+
+def format_inform_v4(sensor, *reading):
+    return format_reading_inform(sensor, reading, 4)
 
 
 def format_inform_v5(sensor, *reading):
-    timestamp, status, value = sensor.format_reading(reading, 5)
-    return Message.inform(
-        "sensor-status", timestamp, "1", sensor.name, status, value)
+    return format_reading_inform(sensor, reading, 5)
 
 
 def update_in_ioloop(update):
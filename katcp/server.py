@@ -11,6 +11,7 @@ from future import standard_library
 standard_library.install_aliases()  # noqa E402
 
 import logging
+import os
 import re
 import socket
 import sys
@@ -41,13 +42,12 @@ import katcp
 
 from .core import (DEFAULT_KATCP_MAJOR, MS_TO_SEC_FAC, SEC_TO_MS_FAC,
                    SEC_TS_KATCP_MAJOR, VERSION_CONNECT_KATCP_MAJOR, AsyncReply,
-                   DeviceServerMetaclass, FailReply, Message, MessageParser,
-                   ProtocolFlags, ensure_native_str)
+                   DeviceServerMetaclass, FailReply, LatencyTimer, Message,
+                   MessageParser, ProtocolFlags, ensure_native_str)
 from .ioloop_manager import IOLoopManager, with_relative_timeout
 from .kattypes import (Int, Str, has_katcp_protocol_flags,
                        minimum_katcp_version, request, return_reply)
-from .sampling import (SampleNone, SampleStrategy, format_inform_v4,
-                       format_inform_v5)
+from .sampling import SampleNone, SampleStrategy, format_reading_inform
 
 log = logging.getLogger("katcp.server")
 
@@ -82,6 +82,50 @@ def return_future(fn):
     return decorated
 
 
+_PATTERN_CACHE = {}
+_PATTERN_CACHE_MAX_SIZE = 256
+
+
+def _get_pattern(pattern):
+    """Return the compiled regular expression for pattern.
+
+    Compiled patterns are cached in a module-level dictionary so that
+    clients repeatedly polling with the same regular expression do not pay
+    the compilation cost on every request. The cache is cleared when it
+    grows beyond _PATTERN_CACHE_MAX_SIZE entries.
+
+    """
+    try:
+        return _PATTERN_CACHE[pattern]
+    except KeyError:
+        if len(_PATTERN_CACHE) >= _PATTERN_CACHE_MAX_SIZE:
+            _PATTERN_CACHE.clear()
+        compiled = _PATTERN_CACHE[pattern] = re.compile(pattern)
+        return compiled
+
+
+def _maybe_regex(pattern):
+    """Check whether a name pattern is a regular expression.
+
+    Parameters
+    ----------
+    pattern : str
+        Sensor name, or regular expression if it starts and ends with '/'.
+
+    Returns
+    -------
+    is_regex : bool
+        True if pattern is a regular expression.
+    compiled : compiled regular expression or None
+        The (cached) compiled regular expression, or None if pattern is not
+        a regular expression.
+
+    """
+    if pattern.startswith('/') and pattern.endswith('/'):
+        return True, _get_pattern(pattern[1:-1])
+    return False, None
+
+
 def construct_name_filter(pattern):
     """Return a function for filtering sensor names based on a pattern.
 
@@ -104,9 +148,9 @@ def construct_name_filter(pattern):
     """
     if pattern is None:
         return False, lambda name: True
-    if pattern.startswith('/') and pattern.endswith('/'):
-        name_re = re.compile(pattern[1:-1])
-        return False, lambda name: name_re.search(name) is not None
+    is_regex, regex = _maybe_regex(pattern)
+    if is_regex:
+        return False, lambda name: regex.search(name) is not None
     return True, lambda name: name == pattern
 
 
@@ -119,6 +163,7 @@ class ClientConnection(object):
         self._disconnect_called = False
         self._get_address = partial(server.get_address, conn_id)
         self._send_message = partial(server.send_message, conn_id)
+        self._send_messages = partial(server.send_messages, conn_id)
         self._mass_send_message = server.mass_send_message
         self.flush_on_close = partial(server.flush_on_close, conn_id)
 
@@ -170,6 +215,28 @@ class ClientConnection(object):
         inform.mid = orig_req.mid
         return self._send_message(inform)
 
+    def reply_informs(self, informs, orig_req):
+        """Send a sequence of informs as part of the reply to an earlier request.
+
+        The informs are written to the client in one go, which is much cheaper
+        than sending them one at a time when replying with many informs.
+
+        Parameters
+        ----------
+        informs : list of Message objects
+            The inform messages to send.
+        orig_req : Message object
+            The request message being replied to. The id of each inform
+            message is overridden with the id from orig_req before the
+            informs are sent.
+
+        """
+        for inform in informs:
+            assert (inform.mtype == Message.INFORM)
+            assert (inform.name == orig_req.name)
+            inform.mid = orig_req.mid
+        return self._send_messages(informs)
+
     def mass_inform(self, msg):
         """Send an inform message to all clients.
 
@@ -217,6 +284,7 @@ class ThreadsafeClientConnection(ClientConnection):
     def __init__(self, server, conn_id):
         super(ThreadsafeClientConnection, self).__init__(server, conn_id)
         self._send_message = partial(server.send_message_from_thread, conn_id)
+        self._send_messages = partial(server.send_messages_from_thread, conn_id)
         self._mass_send_message = server.mass_send_message_from_thread
 
 
@@ -236,6 +304,14 @@ class KATCPServer(object):
     If more than MAX_MSG_SIZE bytes are read from the client without
     encountering a message terminator (i.e. newline), the connection is closed.
 
+    """
+    MAX_READ_BUFFER_SIZE = 4*MAX_MSG_SIZE
+    """Maximum number of received bytes to be buffered.
+
+    This is larger than MAX_MSG_SIZE so that a burst of pipelined messages
+    can be buffered in one go. If more than MAX_READ_BUFFER_SIZE bytes are
+    waiting to be processed, the connection is closed.
+
     """
     MAX_WRITE_BUFFER_SIZE = 2*MAX_MSG_SIZE
     """Maximum outstanding bytes to be buffered by the server process.
@@ -244,6 +320,13 @@ class KATCPServer(object):
     connection is closed. Note that the OS also buffers socket writes,
     so more than MAX_WRITE_BUFFER_SIZE bytes may be untransmitted in total.
 
+    """
+    MAX_LOOP_LATENCY = 0.03
+    """Do not spend more than this many seconds reading pipelined client data
+
+    IOStream inline-reading can result in ioloop starvation (see
+    https://groups.google.com/forum/#!topic/python-tornado/yJrDAwDR_kA).
+
     """
     DISCONNECT_TIMEOUT = 1
     """How long to wait for the device on_client_disconnect() to complete.
@@ -254,6 +337,20 @@ class KATCPServer(object):
 
     """
 
+    DEBUG_THREAD_CHECK = os.environ.get(
+        'KATCP_DEBUG_THREAD', '').lower() in ('1', 'true', 'yes')
+    """Check that per-message methods are called in the IOLoop thread.
+
+    These checks are made for every message sent, so they are disabled by
+    default. Set the KATCP_DEBUG_THREAD environment variable to 1, true or
+    yes to enable them. The variable is read once when this module is
+    imported; to change it afterwards, set this attribute on the class or
+    on a server instance.
+    Methods that are only called once per server or connection are always
+    checked.
+
+    """
+
     client_connection_factory = ClientConnection
     """Factory that produces a ClientConnection compatible instance.
 
@@ -384,10 +481,10 @@ class KATCPServer(object):
         # Make sure we have an ioloop
         self.ioloop = self._ioloop_manager.get_ioloop()
         self._ioloop_manager.start()
-        # Set max_buffer_size to ensure streams are closed
-        # if too-large messages are received
+        # Set max_buffer_size to ensure streams are closed if clients
+        # send data faster than we can handle it
         self._tcp_server = tornado.tcpserver.TCPServer(
-            self.ioloop, max_buffer_size=self.MAX_MSG_SIZE)
+            self.ioloop, max_buffer_size=self.MAX_READ_BUFFER_SIZE)
         self._tcp_server.handle_stream = self._handle_stream
         self._server_sock = self._bind_socket(self._bindaddr)
         self._bindaddr = self._server_sock.getsockname()
@@ -505,7 +602,7 @@ class KATCPServer(object):
                     e_type, e_value, trace, self._tb_limit))
                 log_msg = 'Device error initialising connection {0}'.format(reason)
                 self._logger.error(log_msg)
-                data = bytes(Message.inform('log', log_msg)) + b"\n"
+                data = Message.inform('log', log_msg).to_line()
                 stream.write(data)
                 stream.close(exc_info=True)
             else:
@@ -518,6 +615,7 @@ class KATCPServer(object):
     def _line_read_loop(self, stream, client_conn):
         assert get_thread_ident() == self.ioloop_thread_id
         client_address = self.get_address(stream)
+        latency_timer = LatencyTimer(self.MAX_LOOP_LATENCY)
         try:
             while True:
                 try:
@@ -527,7 +625,17 @@ class KATCPServer(object):
                         # resulting in message handlers being called with a
                         # closed connection. Exit early instead.
                         break
-                    line = yield stream.read_until_regex(b'\n|\r')
+                    # Streams are closed if too-large messages are received
+                    line_fut = stream.read_until_regex(
+                        self._parser.LINE_TERMINATOR_RE,
+                        max_bytes=self.MAX_MSG_SIZE)
+                    # Only yield to the ioloop if we have been handling
+                    # buffered data for too long, since a yield per message
+                    # adds an ioloop round trip to every message
+                    latency_timer.check_future(line_fut)
+                    if latency_timer.time_to_yield():
+                        yield gen.moment
+                    line = yield line_fut
                 except iostream.StreamClosedError:
                     # Assume that _stream_closed_callback() will handle this
                     break
@@ -535,6 +643,7 @@ class KATCPServer(object):
                         self._logger.warn('Unhandled Exception '
                                           'while reading from client {0}:'
                                           .format(client_address), exc_info=True)
+                        continue
                 try:
                     line = line.replace(b"\r", b"\n").split(b"\n")[0]
                     msg = self._parser.parse(line) if line else None
@@ -554,11 +663,6 @@ class KATCPServer(object):
                 except Exception:
                     self._logger.error('Error handling message {0!s}'
                                        .format(msg), exc_info=True)
-                # Allow the ioloop to run since we may be starving it if
-                # there is buffered data in the stream, resulting in yield
-                # stream.read_until_regex('\n|\r') never actually yielding
-                # control to the ioloop
-                yield gen.moment
         except Exception:
             self._logger.error('Unexpected exception in read-loop for client {0}:'
                                .format(client_address))
@@ -637,17 +741,72 @@ class KATCPServer(object):
         bytes are queued for sending, implying that client is falling behind.
 
         """
-        assert get_thread_ident() == self.ioloop_thread_id
+        if self.DEBUG_THREAD_CHECK:
+            assert get_thread_ident() == self.ioloop_thread_id
+        try:
+            return self._write_to_stream(stream, msg.to_line())
+        except Exception:
+            self._send_failed(stream, 'message {0!r}'.format(str(msg)))
+
+    def send_messages(self, stream, msgs):
+        """Send a sequence of messages to a particular client.
+
+        The messages are serialised into buffers that are written to the
+        stream in as few calls as possible, avoiding per-message write
+        overhead. Each buffer is kept well below MAX_WRITE_BUFFER_SIZE so
+        that large replies can drain to the socket as they are written.
+
+        Parameters
+        ----------
+        stream : :class:`tornado.iostream.IOStream` object
+            The stream to send the messages to.
+        msgs : list of Message objects
+            The messages to send, in order.
+
+        Notes
+        -----
+        This method can only be called in the IOLoop thread.
+
+        Failures are handled in the same way as for send_message().
+
+        """
+        if self.DEBUG_THREAD_CHECK:
+            assert get_thread_ident() == self.ioloop_thread_id
+        if not msgs:
+            return
+        # Tornado checks max_write_buffer_size before writing anything to
+        # the socket, so a single huge write would close the connection
+        chunk_size = self.MAX_WRITE_BUFFER_SIZE // 4
         try:
-            if stream.KATCPServer_closing or stream.closed():
-                raise RuntimeError(
-                    'Stream is closing or closed so we cannot accept any more writes')
-            return stream.write(bytes(msg) + b'\n')
+            lines = []
+            pending = 0
+            for msg in msgs:
+                line = msg.to_line()
+                lines.append(line)
+                pending += len(line)
+                if pending >= chunk_size:
+                    write_future = self._write_to_stream(
+                        stream, b''.join(lines))
+                    lines = []
+                    pending = 0
+            if lines:
+                write_future = self._write_to_stream(stream, b''.join(lines))
+            return write_future
         except Exception:
-            addr = self.get_address(stream)
-            self._logger.warn('Could not send message {0!r} to {1}'
-                              .format(str(msg), addr), exc_info=True)
-            stream.close(exc_info=True)
+            self._send_failed(stream, '{0} messages'.format(len(msgs)))
+
+    def _write_to_stream(self, stream, data):
+        if stream.KATCPServer_closing or stream.closed():
+            raise RuntimeError(
+                'Stream is closing or closed so we cannot accept any more writes')
+        return stream.write(data)
+
+    def _send_failed(self, stream, what):
+        # Must be called from an except block so that exc_info is available
+        addr = self.get_address(stream)
+        self._logger.warn('Could not send {0} to {1}'.format(what, addr),
+                          exc_info=True)
+        stream.close(exc_info=True)
 
     def flush_on_close(self, stream):
         """Flush tornado iostream write buffer and prevent further writes.
@@ -720,6 +879,14 @@ class KATCPServer(object):
         """
         return self.call_from_thread(partial(self.send_message, stream, msg))
 
+    def send_messages_from_thread(self, stream, msgs):
+        """Thread-safe version of send_messages() returning a Future instance.
+
+        See return value and notes for send_message_from_thread().
+
+        """
+        return self.call_from_thread(partial(self.send_messages, stream, msgs))
+
     def mass_send_message(self, msg):
         """Send a message to all connected clients.
 
@@ -727,11 +894,20 @@ class KATCPServer(object):
         -----
         This method can only be called in the IOLoop thread.
 
+        The message is serialised only once and the same data is written to
+        each client.
+
         """
-        for stream in self._connections.keys():
+        if self.DEBUG_THREAD_CHECK:
+            assert get_thread_ident() == self.ioloop_thread_id
+        data = msg.to_line()
+        for stream in list(self._connections):
             if not stream.closed():
                 # Don't cause noise by trying to write to already closed streams
-                self.send_message(stream, msg)
+                try:
+                    self._write_to_stream(stream, data)
+                except Exception:
+                    self._send_failed(stream, 'message {0!r}'.format(str(msg)))
 
     def mass_send_message_from_thread(self, msg):
         """Thread-safe version of send_message() returning a Future instance.
@@ -759,6 +935,18 @@ class ClientRequestConnection(object):
         inf_msg = Message.reply_inform(self.msg, *args)
         return self.client_connection.inform(inf_msg)
 
+    def informs(self, arg_lists):
+        """Send a sequence of informs as part of the reply to this request.
+
+        Parameters
+        ----------
+        arg_lists : iterable of sequences
+            Arguments for each inform message, in the order they are sent.
+
+        """
+        inf_msgs = [Message.reply_inform(self.msg, *args) for args in arg_lists]
+        return self.client_connection.reply_informs(inf_msgs, self.msg)
+
     def reply(self, *args):
         rep_msg = Message.reply_to_request(self.msg, *args)
         self._post_reply()
@@ -778,6 +966,7 @@ class ClientRequestConnection(object):
         self.reply = self.reply_again
         self.reply_with_message = self.reply_again
         self.inform = self.inform_after_reply
+        self.informs = self.inform_after_reply
 
     def reply_again(self, *args):
         raise RuntimeError('Reply to request %r already sent.' % self.msg)
@@ -1062,26 +1251,8 @@ class DeviceServerBase(with_metaclass(DeviceServerMetaclass, object)):
                     concurrent_str = ' CONCURRENT' if concurrent else ''
 
                     done_future = Future()
-                    def async_reply(f):
-                        try:
-                            connection.reply(f.result(), msg)
-                            self._logger.debug("%s FUTURE%s replied",
-                                               msg.name, concurrent_str)
-                        except FailReply as e:
-                            reason = str(e)
-                            self._logger.error("Request %s FUTURE%s FAIL: %s",
-                                               msg.name, concurrent_str, reason)
-                            reply = Message.reply(msg.name, "fail", reason)
-                            connection.reply(reply, msg)
-                        except AsyncReply:
-                            self._logger.debug("%s FUTURE ASYNC OK"
-                                               % (msg.name,))
-                        except Exception:
-                            error_reply = self.create_exception_reply_and_log(
-                                msg, sys.exc_info())
-                            connection.reply(error_reply, msg)
-                        finally:
-                            done_future.set_result(None)
+                    async_reply = partial(self._async_reply, connection, msg,
+                                          concurrent_str, done_future)
 
                     # TODO When using the return_reply() decorator the future
                     # returned is not currently thread-safe, must either deal
@@ -1119,6 +1290,28 @@ class DeviceServerBase(with_metaclass(DeviceServerMetaclass, object)):
         if send_reply:
             connection.reply(reply, msg)
 
+    def _async_reply(self, connection, msg, concurrent_str, done_future,
+                     reply_future):
+        """Send the reply of an async request handler once it resolves."""
+        try:
+            connection.reply(reply_future.result(), msg)
+            self._logger.debug("%s FUTURE%s replied",
+                               msg.name, concurrent_str)
+        except FailReply as e:
+            reason = str(e)
+            self._logger.error("Request %s FUTURE%s FAIL: %s",
+                               msg.name, concurrent_str, reason)
+            reply = Message.reply(msg.name, "fail", reason)
+            connection.reply(reply, msg)
+        except AsyncReply:
+            self._logger.debug("%s FUTURE ASYNC OK" % (msg.name,))
+        except Exception:
+            error_reply = self.create_exception_reply_and_log(
+                msg, sys.exc_info())
+            connection.reply(error_reply, msg)
+        finally:
+            done_future.set_result(None)
+
     def create_exception_reply_and_log(self, req_msg, exc_info):
         e_type, e_value, trace = exc_info
         reason = "\n".join(traceback.format_exception(
@@ -1521,6 +1714,10 @@ class DeviceServer(DeviceServerBase):
         self.extra_versions = {}
         self._restart_queue = None
         self._sensors = {}  # map names to sensor objects
+        # Token replaced whenever sensors are added or removed, used to
+        # invalidate the cached list of sensors sorted by name
+        self._sensors_token = object()
+        self._sorted_sensors_cache = (None, ())
         # map client sockets to map of sensors -> sampling strategies
         self._strategies = {}
         # For holding ClientConnection* instances of active connections
@@ -1638,6 +1835,7 @@ class DeviceServer(DeviceServerBase):
 
         """
         self._sensors[sensor.name] = sensor
+        self._sensors_token = object()
 
     def has_sensor(self, sensor_name):
         """Whether the sensor with specified name is known."""
@@ -1659,6 +1857,7 @@ class DeviceServer(DeviceServerBase):
         else:
             sensor_name = sensor.name
         sensor = self._sensors.pop(sensor_name)
+        self._sensors_token = object()
 
         def cancel_sensor_strategies():
             for conn_strategies in self._strategies.values():
@@ -1697,6 +1896,47 @@ class DeviceServer(DeviceServerBase):
         """
         return list(self._sensors.values())
 
+    def _get_sorted_sensors(self):
+        """Fetch (name, sensor) tuples for all sensors, sorted by name.
+
+        The sorted sequence is cached until a sensor is added or removed.
+
+        """
+        # Read the token before the sensors so that a concurrent change
+        # cannot leave a stale sequence in the cache
+        token = self._sensors_token
+        cached_token, sorted_sensors = self._sorted_sensors_cache
+        if cached_token is not token:
+            sorted_sensors = tuple(sorted(self._sensors.items()))
+            self._sorted_sensors_cache = (token, sorted_sensors)
+        return sorted_sensors
+
+    def _filter_sorted_sensors(self, pattern):
+        """Fetch (name, sensor) tuples matching a pattern, sorted by name.
+
+        Parameters
+        ----------
+        pattern : str
+            Sensor name or regular expression, as for
+            :func:`construct_name_filter`.
+
+        Returns
+        -------
+        exact : bool
+            True if pattern is expected to match exactly.
+        sensors : list of (str, :class:`Sensor` object) tuples
+            The matching sensors, sorted by name.
+
+        """
+        is_regex, regex = _maybe_regex(pattern)
+        sensors = self._sensors
+        if not is_regex:
+            sensor = sensors.get(pattern)
+            return True, [(pattern, sensor)] if sensor is not None else []
+        # Only the matching names are sorted and looked up
+        return False, [(name, sensors[name])
+                       for name in sorted(filter(regex.search, sensors))]
+
     def set_restart_queue(self, restart_queue):
         """Set the restart queue.
 
@@ -2109,10 +2349,12 @@ class DeviceServer(DeviceServerBase):
             !sensor-list ok 2
 
         """
-        exact, name_filter = construct_name_filter(ensure_native_str(msg.arguments[0])
-                                                   if msg.arguments else None)
-        sensors = [(name, sensor) for name, sensor in
-                   sorted(self._sensors.items()) if name_filter(name)]
+        if msg.arguments:
+            exact, sensors = self._filter_sorted_sensors(
+                ensure_native_str(msg.arguments[0]))
+        else:
+            # Fast path for the common case of listing all sensors
+            exact, sensors = False, self._get_sorted_sensors()
 
         if exact and not sensors:
             return req.make_reply("fail", "Unknown sensor name.")
@@ -2121,9 +2363,9 @@ class DeviceServer(DeviceServerBase):
         return req.make_reply("ok", str(len(sensors)))
 
     def _send_sensor_value_informs(self, req, sensors):
-        for name, sensor in sensors:
-            req.inform(name, sensor.description, sensor.units, sensor.stype,
-                       *sensor.formatted_params)
+        req.informs([(name, sensor.description, sensor.units, sensor.stype) +
+                     tuple(sensor.formatted_params)
+                     for name, sensor in sensors])
 
     def request_sensor_value(self, req, msg):
         """Request the value of a sensor or sensors.
@@ -2174,18 +2416,22 @@ class DeviceServer(DeviceServerBase):
             !sensor-value ok 1
 
         """
-        exact, name_filter = construct_name_filter(ensure_native_str(msg.arguments[0])
-                                                   if msg.arguments else None)
-        sensors = [(name, sensor) for name, sensor in
-                   sorted(self._sensors.items()) if name_filter(name)]
+        if msg.arguments:
+            exact, sensors = self._filter_sorted_sensors(
+                ensure_native_str(msg.arguments[0]))
+        else:
+            # Fast path for the common case of listing all sensors
+            exact, sensors = False, self._get_sorted_sensors()
 
         if exact and not sensors:
             return req.make_reply("fail", "Unknown sensor name.")
 
         katcp_version = self.PROTOCOL_INFO.major
+        informs = []
         for name, sensor in sensors:
             timestamp, status, value = sensor.read_formatted(katcp_version)
-            req.inform(timestamp, "1", name, status, value)
+            informs.append((timestamp, b"1", name, status, value))
+        req.informs(informs)
         return req.make_reply("ok", str(len(sensors)))
 
     def request_sensor_sampling(self, req, msg):
@@ -2323,14 +2569,9 @@ class DeviceServer(DeviceServerBase):
                 raise FailReply("Strategy %s not allowed for version %d of katcp"
                                 % (ensure_native_str(strategy), katcp_version))
 
-            format_inform = (format_inform_v5
-                             if katcp_version >= SEC_TS_KATCP_MAJOR
-                             else format_inform_v4)
-
             def inform_callback(sensor, reading):
                 """Inform callback for sensor strategy."""
-                timestamp, status, value = reading
-                cb_msg = format_inform(sensor, timestamp, status, value)
+                cb_msg = format_reading_inform(sensor, reading, katcp_version)
                 client.inform(cb_msg)
 
             if katcp_version < SEC_TS_KATCP_MAJOR and strategy == b'period':
@@ -2377,8 +2618,7 @@ class DeviceServer(DeviceServerBase):
 
         def inform_callback(sensor, reading):
             """Inform callback for sensor strategy."""
-            timestamp, status, value = reading
-            cb_msg = format_inform_v5(sensor, timestamp, status, value)
+            cb_msg = format_reading_inform(sensor, reading, 5)
             client.inform(cb_msg)
 
         names_arg = ensure_native_str(msg.arguments[0])
@@ -10,16 +10,18 @@ from __future__ import absolute_import, division, print_function
 from future import standard_library
 standard_library.install_aliases()  # noqa: E402
 
+import concurrent.futures
 import logging
 import unittest
 
 import future
+import mock
 import tornado
 
 import katcp
 
 from katcp import KatcpSyntaxError, KatcpTypeError
-from katcp.core import (AsyncEvent, AsyncState, Message, Sensor,
+from katcp.core import (AsyncEvent, AsyncState, DefaultAttrDict, Message, Sensor,
                         hashable_identity, until_some)
 from katcp.testutils import TestLogHandler
 
@@ -142,6 +144,12 @@ class TestMessage(unittest.TestCase):
         msg = Message.reply('fail', 'on fire', mid=234)
         self.assertEqual(bytes(msg), b'!fail[234] on\\_fire')
 
+    def test_to_line(self):
+        msg = Message.reply('fail', 'on fire', mid=234)
+        self.assertEqual(msg.to_line(), b'!fail[234] on\\_fire\n')
+        msg = Message.inform('watchdog')
+        self.assertEqual(msg.to_line(), bytes(msg) + b'\n')
+
     def test_str(self):
         msg = Message.reply('fail', 'on fire', mid=234)
         self.assertEqual(str(msg), '!fail[234] on\\_fire')
@@ -197,6 +205,19 @@ class TestMessageParser(unittest.TestCase):
     def setUp(self):
         self.p = katcp.MessageParser()
 
+    def test_name_conversion_cached(self):
+        """Test message names are converted once between str and bytes."""
+        m = self.p.parse(b"?cached-name arg")
+        self.assertEqual(m.name, "cached-name")
+        self.assertIs(self.p.parse(b"!cached-name ok").name, m.name)
+        self.assertEqual(bytes(m), b"?cached-name arg")
+        with mock.patch('katcp.core._NAME_CACHE_MAX_SIZE', 0):
+            m = self.p.parse(b"?another-name")
+            self.assertEqual(m.name, "another-name")
+            self.assertEqual(bytes(m), b"?another-name")
+            self.assertEqual(katcp.core._native_names,
+                             {b"another-name": "another-name"})
+
     def test_simple_messages(self):
         """Test simple messages."""
         m = self.p.parse(b"?foo")
@@ -224,6 +245,11 @@ class TestMessageParser(unittest.TestCase):
         # test unescaped null
         self.assertRaises(KatcpSyntaxError, self.p.parse, b"?foo \0")
 
+        # escapes and specials in only one of several arguments
+        m = self.p.parse(br"?foo plain a\_b plain")
+        self.assertEqual(m.arguments, [b"plain", b"a b", b"plain"])
+        self.assertRaises(KatcpSyntaxError, self.p.parse, b"?foo plain a\x1bb plain")
+
     def test_syntax_errors(self):
         """Test generation of syntax errors."""
         self.assertRaises(KatcpSyntaxError, self.p.parse, br" ?foo")
@@ -442,6 +468,31 @@ class TestSensor(unittest.TestCase):
                            initial_status=Sensor.NOMINAL)
         self.assertEqual(s.status(), Sensor.NOMINAL)
 
+    def test_formatted_reading_cache(self):
+        """Test a reading is only reformatted when the reading changes."""
+        s = Sensor.integer("an.int", "An integer.", "count", [-4, 3])
+        s.set(timestamp=12345, status=Sensor.NOMINAL, value=3)
+        with mock.patch.object(s, '_formatter',
+                               wraps=s._formatter) as formatter:
+            formatted = s.read_formatted()
+            self.assertEqual(formatted, (b"12345.000000", b"nominal", b"3"))
+            self.assertIs(s.read_formatted(), formatted)
+            self.assertIs(s.format_reading(s.read()), formatted)
+            self.assertEqual(formatter.call_count, 1)
+            # A different major version is formatted separately
+            self.assertEqual(s.read_formatted(4),
+                             (b"12345000", b"nominal", b"3"))
+            self.assertEqual(formatter.call_count, 2)
+            # An equal reading that is a different object is also formatted
+            self.assertEqual(s.format_reading(tuple(s.read()), 4),
+                             (b"12345000", b"nominal", b"3"))
+            self.assertEqual(formatter.call_count, 3)
+            # Setting an identical reading still invalidates the cache
+            s.set(timestamp=12346, status=Sensor.NOMINAL, value=3)
+            self.assertEqual(s.read_formatted(),
+                             (b"12346.000000", b"nominal", b"3"))
+            self.assertEqual(formatter.call_count, 4)
+
     def test_float_sensor(self):
         """Test float sensor."""
         s = Sensor.float("a.float", "A float.", "power", [0.0, 5.0])
@@ -815,6 +866,31 @@ class TestUntilSome(tornado.testing.AsyncTestCase):
         self.assertDictContainsSubset(dict(results), options,
                                       'Results differ for until_some (2 kwarg futures)')
 
+    @tornado.testing.gen_test
+    def test_until_some_exception(self):
+        f1 = tornado.concurrent.Future()
+        f2 = tornado.concurrent.Future()
+        f3 = tornado.concurrent.Future()
+        f1.set_result(24)
+        # A failed future is raised without waiting for the rest
+        f2.set_exception(ValueError('f2 failed'))
+        with self.assertRaises(ValueError):
+            yield until_some(f1, f2, f3, timeout=0.1)
+        # Results are in order of completion
+        f4 = tornado.concurrent.Future()
+        f5 = tornado.concurrent.Future()
+        self.io_loop.add_callback(f5.set_result, 42)
+        self.io_loop.add_callback(f4.set_result, 84)
+        results = yield until_some(f4, f5, timeout=0.1)
+        self.assertEqual(results, [(1, 42), (0, 84)])
+
+    @tornado.testing.gen_test
+    def test_until_some_concurrent_future_exception(self):
+        f1 = concurrent.futures.Future()
+        f1.set_exception(ValueError('f1 failed'))
+        with self.assertRaises(ValueError):
+            yield until_some(f1, timeout=0.1)
+
 
 class TestHashableIdentity(unittest.TestCase):
 
@@ -856,3 +932,17 @@ class TestHashableIdentity(unittest.TestCase):
         hash2 = hashable_identity('foo')
         self.assertEqual(hash1, hash1_again)
         self.assertNotEqual(hash1, hash2)
+
+
+class TestDefaultAttrDict(unittest.TestCase):
+
+    def test_default_attribute(self):
+        DUT = DefaultAttrDict(list)
+        self.assertEqual(DUT.missing, [])
+        self.assertIn('missing', DUT)
+
+    def test_special_attribute_probe(self):
+        DUT = DefaultAttrDict(list)
+        self.assertFalse(hasattr(DUT, '__deepcopy__'))
+        self.assertNotIn('__deepcopy__', DUT)
+        self.assertEqual(len(DUT), 0)
@@ -233,6 +233,85 @@ class TestInspectingClientInspect(tornado.testing.AsyncTestCase):
     def test_inspect_request_with_timeout_hints(self):
         yield self._test_inspect_requests(timeout_hints=True)
 
+    @tornado.gen.coroutine
+    def _test_inspect(self, pipeline_inspection):
+        host, port, server = self._get_server(hints=False)
+        DUT = InspectingClientAsync(host, port, ioloop=self.io_loop)
+        DUT.pipeline_inspection = pipeline_inspection
+        DUT._state_loop = mock.Mock()
+        yield DUT.connect(timeout=1)
+        model_changes = yield DUT.inspect()
+        self.assertEqual(DUT._requests_index,
+                         self._get_expected_request_index(server))
+        self.assertEqual(set(DUT._sensors_index), set(server._sensors))
+        self.assertEqual(model_changes.requests.added,
+                         set(server._request_handlers))
+        self.assertEqual(model_changes.sensors.added, set(server._sensors))
+
+        # Check whether ?sensor-list is sent before ?help is answered
+        replies = []
+
+        def future_request(msg, timeout=None):
+            replies.append((msg, tornado.concurrent.Future()))
+            return replies[-1][1]
+
+        with mock.patch.object(DUT.katcp_client, 'future_request',
+                               side_effect=future_request):
+            inspected = DUT.inspect()
+            yield tornado.gen.moment
+            sent = [msg.name for msg, _ in replies]
+            if pipeline_inspection:
+                self.assertEqual(sent, ['help', 'sensor-list'])
+            else:
+                self.assertEqual(sent, ['help'])
+            replies[0][1].set_result((Message.reply('help', 'ok', 0), []))
+            while len(replies) < 2:
+                yield tornado.gen.moment
+            replies[1][1].set_result((Message.reply('sensor-list', 'ok', 0), []))
+            yield inspected
+
+    @tornado.testing.gen_test
+    def test_inspect_pipelined(self):
+        yield self._test_inspect(pipeline_inspection=True)
+
+    @tornado.testing.gen_test
+    def test_inspect_sequential(self):
+        yield self._test_inspect(pipeline_inspection=False)
+
+    @tornado.testing.gen_test
+    def test_inspect_pipelined_help_fails(self):
+        host, port, server = self._get_server(hints=False)
+        DUT = InspectingClientAsync(host, port, ioloop=self.io_loop)
+        DUT._state_loop = mock.Mock()
+        yield DUT.connect(timeout=1)
+        yield DUT.inspect()
+        sensor_index_before = dict(DUT._sensors_index)
+        removed_name = sorted(sensor_index_before)[0]
+        removed_sensor = mock.Mock()
+        DUT._sensor_object_cache[removed_name] = removed_sensor
+        # ?sensor-list succeeds and reports a removed sensor, but ?help fails
+        sensor_informs = [Message.inform('sensor-list', name, 'desc', '',
+                                         'integer', 0, 10)
+                          for name in sorted(sensor_index_before)
+                          if name != removed_name]
+
+        def future_request(msg, timeout=None):
+            f = tornado.concurrent.Future()
+            if msg.name == 'help':
+                f.set_result((Message.reply('help', 'fail', 'broken'), []))
+            else:
+                f.set_result((Message.reply('sensor-list', 'ok',
+                                            len(sensor_informs)),
+                              sensor_informs))
+            return f
+
+        with mock.patch.object(DUT.katcp_client, 'future_request',
+                               side_effect=future_request):
+            with self.assertRaises(inspecting_client.SyncError):
+                yield DUT.inspect()
+        self.assertEqual(set(DUT._sensors_index), set(sensor_index_before))
+        self.assertIs(DUT._sensor_object_cache[removed_name], removed_sensor)
+
     # TODO NM 2017-04-12 Tests should be added for sensor index. I just added
     # the minimum needed to test new functionality for CB-569
 
@@ -14,6 +14,7 @@ import weakref
 
 from builtins import object
 from concurrent.futures import TimeoutError
+from functools import partial
 
 import mock
 import tornado
@@ -100,6 +101,70 @@ class test_KATCPClientResourceRequest(unittest.TestCase):
         self.assertIs(reply, self.mock_client.wrapped_request.return_value)
 
 
+class test_GroupRequest(tornado.testing.AsyncTestCase):
+    def setUp(self):
+        super(test_GroupRequest, self).setUp()
+        self.reply_futures = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        clients = []
+        for name in ('client1', 'client2', 'client3', 'client4'):
+            client = mock.Mock()
+            client.name = name
+            client.req.the_request.side_effect = partial(self._request, name)
+            clients.append(client)
+        self.group = AttrDict(clients=clients)
+
+    def _request(self, name, *args, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        f = tornado.concurrent.Future()
+        self.reply_futures.append(f)
+        f.add_done_callback(lambda _: setattr(self, 'in_flight', self.in_flight - 1))
+        return f
+
+    @tornado.gen.coroutine
+    def _reply_all(self, result_future):
+        # Keep replying to requests as they arrive until the group is done
+        while not result_future.done():
+            for f in list(self.reply_futures):
+                if not f.done():
+                    f.set_result('ok')
+            yield tornado.gen.moment
+
+    @tornado.testing.gen_test
+    def test_unlimited(self):
+        DUT = resource_client.GroupRequest(self.group, 'the_request', 'desc')
+        result_future = DUT()
+        self.assertEqual(self.in_flight, 4)
+        yield self._reply_all(result_future)
+        result = yield result_future
+        self.assertEqual(dict(result), {'client1': 'ok', 'client2': 'ok',
+                                        'client3': 'ok', 'client4': 'ok'})
+
+    @tornado.testing.gen_test
+    def test_limited_concurrency(self):
+        DUT = resource_client.GroupRequest(self.group, 'the_request', 'desc')
+        DUT.MAX_CONCURRENT_REQUESTS = 2
+        result_future = DUT()
+        yield self._reply_all(result_future)
+        result = yield result_future
+        self.assertEqual(self.max_in_flight, 2)
+        self.assertEqual(dict(result), {'client1': 'ok', 'client2': 'ok',
+                                        'client3': 'ok', 'client4': 'ok'})
+
+    @tornado.testing.gen_test
+    def test_limited_concurrency_shared_between_calls(self):
+        DUT = resource_client.GroupRequest(self.group, 'the_request', 'desc')
+        DUT.MAX_CONCURRENT_REQUESTS = 2
+        result_future1 = DUT()
+        result_future2 = DUT()
+        yield self._reply_all(tornado.gen.multi([result_future1,
+                                                 result_future2]))
+        self.assertEqual(self.max_in_flight, 2)
+        self.assertEqual(len(self.reply_futures), 8)
+
+
 class test_KATCPClientResource(tornado.testing.AsyncTestCase):
     def test_init(self):
         resource_spec = dict(
@@ -1369,6 +1434,18 @@ class test_ThreadSafeKATCPClientResourceWrapper(unittest.TestCase):
         self.assertEqual(str(last_server_msg),
                          '?sensor-value[{}] an.int'.format(int(reply.reply.mid)))
 
+    def test_request_decorated_once(self):
+        with mock.patch.object(self.ioloop_thread_wrapper, 'decorate_callable',
+                               wraps=self.ioloop_thread_wrapper.decorate_callable
+                               ) as decorate_callable:
+            for i in range(3):
+                reply = self.DUT.req.sensor_value('an.int')
+                self.assertTrue(reply.succeeded)
+            self.assertEqual(decorate_callable.call_count, 1)
+            reply = self.DUT.req.watchdog()
+            self.assertTrue(reply.succeeded)
+            self.assertEqual(decorate_callable.call_count, 2)
+
     def test_sensor(self):
         server_sensor = self.server.get_sensor('an.int')
         reading = self.DUT.sensor.an_int.get_reading()
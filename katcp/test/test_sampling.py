@@ -49,6 +49,22 @@ class TestSampling(TimewarpAsyncTestCase):
         self.calls = []
         self.inform = inform
 
+    def test_format_reading_inform(self):
+        """Test formatting #sensor-status informs for a sensor reading."""
+        s = self.sensor
+        s.set(12345, Sensor.NOMINAL, 3)
+        reading = s.read()
+        msg = sampling.format_reading_inform(s, reading, 5)
+        self.assertEqual(bytes(msg),
+                         b"#sensor-status 12345.000000 1 an.int nominal 3")
+        # Informs for the same update share its formatted reading
+        other_msg = sampling.format_reading_inform(s, reading, 5)
+        self.assertIs(other_msg.arguments[0], msg.arguments[0])
+        self.assertEqual(bytes(sampling.format_inform_v5(s, *reading)),
+                         bytes(msg))
+        self.assertEqual(bytes(sampling.format_inform_v4(s, *reading)),
+                         b"#sensor-status 12345000 1 an.int nominal 3")
+
     def test_sampling(self):
         """Test getting and setting the sampling."""
         s = self.sensor
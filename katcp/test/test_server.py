@@ -53,6 +53,43 @@ logger = logging.getLogger(__name__)
 NUM_HELP_MESSAGES = 18  # Number of requests on DeviceTestServer
 
 
+class test_construct_name_filter(unittest.TestCase):
+    def test_no_pattern(self):
+        exact, name_filter = katcp.server.construct_name_filter(None)
+        self.assertFalse(exact)
+        self.assertTrue(name_filter("any.sensor"))
+
+    def test_exact_name(self):
+        exact, name_filter = katcp.server.construct_name_filter("a.sensor")
+        self.assertTrue(exact)
+        self.assertTrue(name_filter("a.sensor"))
+        self.assertFalse(name_filter("a.sensor.too"))
+
+    def test_regex(self):
+        exact, name_filter = katcp.server.construct_name_filter("/sens/")
+        self.assertFalse(exact)
+        self.assertIs(name_filter("a.sensor"), True)
+        self.assertIs(name_filter("a.device"), False)
+
+    def test_regex_compiled_once(self):
+        katcp.server._PATTERN_CACHE.clear()
+        with mock.patch("katcp.server.re.compile", wraps=katcp.server.re.compile) as c:
+            katcp.server.construct_name_filter("/^cached/")
+            katcp.server.construct_name_filter("/^cached/")
+        c.assert_called_once_with("^cached")
+
+
+class test_maybe_regex(unittest.TestCase):
+    def test_regex(self):
+        is_regex, regex = katcp.server._maybe_regex("/^a\\./")
+        self.assertTrue(is_regex)
+        self.assertIs(regex, katcp.server._get_pattern("^a\\."))
+
+    def test_name(self):
+        self.assertEqual(katcp.server._maybe_regex("a.sensor"), (False, None))
+        self.assertEqual(katcp.server._maybe_regex("/a.sensor"), (False, None))
+
+
 class test_ClientConnection(unittest.TestCase):
     def test_init(self):
         # Test that the ClientConnection methods are correctly bound to the
@@ -110,6 +147,90 @@ class test_ClientConnection(unittest.TestCase):
         DUT.mass_inform(katcp.Message.inform("blahh"))
         server.mass_send_message.assert_called_once_with(katcp.Message.inform("blahh"))
 
+        # Check that reply_informs sends all informs in one call
+        mid = b"9"
+        rifs_req = katcp.Message.request("rifs", mid=mid)
+        rifs_infs = [katcp.Message.inform("rifs", "a"), katcp.Message.inform("rifs", "b")]
+        DUT.reply_informs(rifs_infs, rifs_req)
+        server.send_messages.assert_called_once_with(raw_socket, rifs_infs)
+        self.assertEqual([inf.mid for inf in rifs_infs], [mid, mid])
+
+
+class test_KATCPServer(unittest.TestCase):
+    def setUp(self):
+        self.DUT = katcp.server.KATCPServer(mock.Mock(), "", 0)
+        self.DUT.ioloop_thread_id = _thread.get_ident()
+
+    def _mock_stream(self, closed=False):
+        stream = mock.Mock()
+        stream.KATCPServer_closing = False
+        stream.KATCPServer_address = ("127.0.0.1", 0)
+        stream.closed.return_value = closed
+        self.DUT._connections[stream] = mock.Mock()
+        return stream
+
+    def test_send_messages(self):
+        stream = self._mock_stream()
+        self.DUT.send_messages(
+            stream, [katcp.Message.inform("a", 1), katcp.Message.inform("b", 2)]
+        )
+        stream.write.assert_called_once_with(b"#a 1\n#b 2\n")
+
+    def test_send_messages_empty(self):
+        stream = self._mock_stream()
+        self.DUT.send_messages(stream, [])
+        self.assertFalse(stream.write.called)
+
+    def test_send_messages_larger_than_write_buffer(self):
+        stream = self._mock_stream()
+        max_size = self.DUT.MAX_WRITE_BUFFER_SIZE
+        msgs = [katcp.Message.inform("big", "x" * 1000, i)
+                for i in range(2 * max_size // 1000)]
+        self.DUT.send_messages(stream, msgs)
+        self.assertFalse(stream.close.called)
+        self.assertGreater(stream.write.call_count, 1)
+        writes = [data for (data,), _ in stream.write.call_args_list]
+        for data in writes:
+            self.assertLess(len(data), max_size)
+        self.assertEqual(b"".join(writes),
+                         b"".join(msg.to_line() for msg in msgs))
+
+    def test_mass_send_message(self):
+        streams = [self._mock_stream(), self._mock_stream()]
+        closed_stream = self._mock_stream(closed=True)
+        self.DUT.mass_send_message(katcp.Message.inform("blah", 1))
+        for stream in streams:
+            stream.write.assert_called_once_with(b"#blah 1\n")
+        self.assertFalse(closed_stream.write.called)
+        # Message is only serialised once for all the clients
+        (data1,), _ = streams[0].write.call_args
+        (data2,), _ = streams[1].write.call_args
+        self.assertIs(data1, data2)
+
+    def test_mass_send_message_write_failure(self):
+        good_stream, bad_stream = self._mock_stream(), self._mock_stream()
+        bad_stream.write.side_effect = IOError("broken pipe")
+        self.DUT.mass_send_message(katcp.Message.inform("blah"))
+        good_stream.write.assert_called_once_with(b"#blah\n")
+        bad_stream.close.assert_called_once_with(exc_info=True)
+        self.assertFalse(good_stream.close.called)
+
+    def test_debug_thread_check(self):
+        stream = self._mock_stream()
+        msg = katcp.Message.inform("blah")
+        self.DUT.ioloop_thread_id = None
+        # Not in the ioloop thread, but only checked when debugging
+        self.DUT.DEBUG_THREAD_CHECK = False
+        self.DUT.send_message(stream, msg)
+        self.DUT.DEBUG_THREAD_CHECK = True
+        with self.assertRaises(AssertionError):
+            self.DUT.send_message(stream, msg)
+        with self.assertRaises(AssertionError):
+            self.DUT.send_messages(stream, [msg])
+        with self.assertRaises(AssertionError):
+            self.DUT.mass_send_message(msg)
+        stream.write.assert_called_once_with(b"#blah\n")
+
 
 class test_ClientRequestConnection(unittest.TestCase):
     def setUp(self):
@@ -129,6 +250,19 @@ class test_ClientRequestConnection(unittest.TestCase):
         self.assertEqual(inf_msg.mid, b"42")
         self.assertEqual(inf_msg.mtype, katcp.Message.INFORM)
 
+    def test_informs(self):
+        arg_lists = [(b"inf1", b"inf2"), (b"inf3",)]
+        self.DUT.informs(arg_lists)
+        self.assertEqual(self.client_connection.reply_informs.call_count, 1)
+        (inf_msgs, req_msg), kwargs = self.client_connection.reply_informs.call_args
+        self.assertIs(req_msg, self.req_msg)
+        self.assertEqual(len(inf_msgs), 2)
+        for inf_msg, arguments in zip(inf_msgs, arg_lists):
+            self.assertSequenceEqual(inf_msg.arguments, arguments)
+            self.assertEqual(inf_msg.name, "test-request")
+            self.assertEqual(inf_msg.mid, b"42")
+            self.assertEqual(inf_msg.mtype, katcp.Message.INFORM)
+
     def test_reply(self):
         arguments = (b"inf1", b"inf2")
         self.DUT.reply(*arguments)
@@ -424,6 +558,36 @@ class test_DeviceServer(unittest.TestCase, TestUtilMixin):
         self.server.add_sensor(katcp.Sensor.boolean("blaah", "blaah sens"))
         self.assertTrue(self.server.has_sensor("blaah"))
 
+    def test_sensor_list_tracks_added_and_removed_sensors(self):
+        def listed_sensor_names():
+            client_conn = ClientConnectionTest()
+            self.server.handle_message(
+                client_conn, katcp.Message.request("sensor-list")
+            )
+            return [inf.arguments[0] for inf in client_conn.informs]
+
+        names = listed_sensor_names()
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(listed_sensor_names(), names)
+        self.server.add_sensor(katcp.Sensor.boolean("0.first", "first sens"))
+        self.assertEqual(listed_sensor_names(), [b"0.first"] + names)
+        self.server.ioloop = mock.Mock()
+        self.server.remove_sensor("0.first")
+        self.assertEqual(listed_sensor_names(), names)
+
+    def test_filter_sorted_sensors(self):
+        self.server.add_sensor(katcp.Sensor.boolean("x.b", "b sens"))
+        self.server.add_sensor(katcp.Sensor.boolean("x.a", "a sens"))
+        exact, sensors = self.server._filter_sorted_sensors("/^x\\./")
+        self.assertFalse(exact)
+        self.assertEqual([name for name, _ in sensors], ["x.a", "x.b"])
+        exact, sensors = self.server._filter_sorted_sensors("x.b")
+        self.assertTrue(exact)
+        self.assertEqual(sensors, [("x.b", self.server.get_sensor("x.b"))])
+        exact, sensors = self.server._filter_sorted_sensors("x.c")
+        self.assertTrue(exact)
+        self.assertEqual(sensors, [])
+
     def test_excluded_default_handlers(self):
         """
         Test that default handers from higher KATCP versions are not included
@@ -1251,6 +1415,16 @@ class TestDeviceServerClientIntegrated(unittest.TestCase, TestUtilMixin):
             "Expected %r to not be in %r" % (client_conn, self.server._client_conns),
         )
 
+    def test_message_too_large(self):
+        """Test that a client sending a too-large message is disconnected."""
+        self.server._server.MAX_MSG_SIZE = 1024
+        self.client.notify_connected = WaitingMock()
+        # The first message lets the server start a read using the new limit
+        self.client.raw_send(b"?watchdog\n?watchdog " + b"x" * 2048)
+        # Wait for the client to be disconnected
+        self.client.notify_connected.assert_wait_call_count(1)
+        self.client.notify_connected.assert_called_once_with(False)
+
     def test_sampling(self):
         """Test sensor sampling."""
         get_msgs = self.client.message_recorder(blacklist=self.BLACKLIST, replies=True)
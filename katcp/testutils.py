@@ -65,6 +65,9 @@ class ClientConnectionTest(object):
     def inform(self, msg):
         self.messages.append(msg)
 
+    def reply_informs(self, msgs, req_msg):
+        self.messages.extend(msgs)
+
     def mass_inform(self, msg):
         self.mass_informs.append(msg)
 
@@ -1972,6 +1975,8 @@ def mock_req(req_name, *args, **kwargs):
     req.reply.side_effect = reply_side_effect
     req.inform.side_effect = lambda *args : req.inform_msgs.append(
         Message.reply_inform(req.msg, *args))
+    req.informs.side_effect = lambda arg_lists : req.inform_msgs.extend(
+        Message.reply_inform(req.msg, *args) for args in arg_lists)
     return req
 
 